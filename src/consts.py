@@ -247,7 +247,14 @@ DATASETS_DIR = Path("./datasets")
 POEMS_CSV = DATASETS_DIR / "poems.csv"
 THEMED_CSV = DATASETS_DIR / "russianPoetryWithTheme.csv"
 OUTPUT_CSV = DATASETS_DIR / "merged_poems.csv"
+MERGED_PARQUET = DATASETS_DIR / "merged_poems.parquet"
 REPORT_EVERY = 200_000
+DATASET_COLUMNS = ("author", "poem_name", "text")
+IO_BUFFER_SIZE = 1 << 20
+CSV_MAX_BLOCK_SIZE = 1 << 30
+PARQUET_BATCH_SIZE = 50_000
+SQLITE_BATCH_SIZE = 10_000
+WORKER_BATCH_SIZE = 10_000
 
 
 @dataclass(frozen=True)
@@ -2,11 +2,9 @@ import argparse
 import sys
 from typing import Iterable, Optional
 
-import pandas as pd
-
-from src.consts import OUTPUT_CSV, POEMS_CSV, REPORT_EVERY, THEMED_CSV
+from src.consts import MERGED_PARQUET, OUTPUT_CSV, POEMS_CSV, REPORT_EVERY, THEMED_CSV
 from src.merge import merge_datasets
-from src.validators import print_validation_report, validate_and_fix_dataset
+from src.validators import print_validation_report, read_dataset, validate_and_fix_dataset
 
 
 def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
@@ -19,6 +17,12 @@ def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Only validate existing merged_poems.csv without re-merging",
     )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=1,
+        help="Read source CSVs in parallel worker processes when above 1 (default: 1)",
+    )
     ns = parser.parse_args(list(argv) if argv is not None else None)
     return ns
 
@@ -30,7 +34,7 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
     if ns.validate_only:
         if not OUTPUT_CSV.exists():
             raise FileNotFoundError(f"Cannot validate: {OUTPUT_CSV} does not exist")
-        df = pd.read_csv(OUTPUT_CSV)
+        df = read_dataset(str(OUTPUT_CSV))
         print_validation_report(df)
         return
 
@@ -42,23 +46,24 @@ def main(argv: Optional[Iterable[str]] = None) -> None:
     merge_stats = merge_datasets(
         poems_csv=POEMS_CSV,
         themed_csv=THEMED_CSV,
-        output_csv=OUTPUT_CSV,
+        output_path=MERGED_PARQUET,
         report_every=REPORT_EVERY,
+        workers=ns.workers,
     )
     print(
         f"Merged. written={merge_stats['written']} dup={merge_stats['skipped_duplicate']} "
-        f"empty={merge_stats['skipped_empty']} read_total={merge_stats['read_total']}",
+        f"empty={merge_stats['skipped_empty']} malformed={merge_stats['skipped_malformed']} "
+        f"read_total={merge_stats['read_total']}",
         file=sys.stderr,
     )
 
-    fix_stats = validate_and_fix_dataset(str(OUTPUT_CSV), str(OUTPUT_CSV))
+    df, fix_stats = validate_and_fix_dataset(str(MERGED_PARQUET), str(OUTPUT_CSV))
     print(
         f"Fixed. original={fix_stats['original_rows']} final={fix_stats['rows_after_dedup']} "
         f"removed={fix_stats['removed_duplicates']}",
         file=sys.stderr,
     )
 
-    df = pd.read_csv(OUTPUT_CSV)
     print_validation_report(df)
 
 
@@ -1,98 +1,250 @@
+import contextlib
 import csv
 import hashlib
+import multiprocessing
 import sqlite3
 import sys
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, Optional, Tuple
+from queue import Empty
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
-from src.consts import Row
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from src.consts import (
+    DATASET_COLUMNS,
+    IO_BUFFER_SIZE,
+    PARQUET_BATCH_SIZE,
+    SQLITE_BATCH_SIZE,
+    WORKER_BATCH_SIZE,
+)
+from src.readers import iter_csv_batches
 
-def configure_csv_field_size_limit() -> None:
-    """Increase the CSV parser field size limit to support very large text fields."""
-    limit = sys.maxsize
-    while True:
-        try:
-            csv.field_size_limit(limit)
-            return
-        except OverflowError:
-            limit = int(limit // 10)
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# Plain (author, poem_name, text) tuple, in Row field order. The merge pipeline
+# passes these instead of Row objects to avoid per-row attribute lookups.
+RowTuple = Tuple[str, str, str]
+# A row paired with its dedup hash, or with None when a required field is empty.
+# Malformed CSV rows are passed on as (None, None) so that they can be counted.
+HashedRow = Tuple[Optional[bytes], Optional[RowTuple]]
+# What a merge worker puts on its queue: a list of rows, an error, or None at the end.
+HashedRowBatch = Union[List[HashedRow], Exception, None]
+
+SEEN_INSERT_SQL = "INSERT OR IGNORE INTO seen(h) VALUES (?)"
 
 
 def collapse_ws(value: str) -> str:
     """Collapse multiple whitespace characters to single space."""
+    # Printable strings contain no whitespace besides " ", so without doubled or
+    # edge spaces the value is already collapsed and can be returned as is.
+    if value.isprintable() and "  " not in value and value[:1] != " " and value[-1:] != " ":
+        return value
     return " ".join(value.split())
 
 
 def normalize_key(author: str, poem_name: str, text: str) -> Tuple[str, str, str]:
-    """Normalize key for deduplication hash."""
+    """
+    Normalize key for deduplication hash.
+
+    author and poem_name must already be whitespace-collapsed, as yielded by the
+    iter_rows_* readers; only text is collapsed here, since the readers merely strip
+    it to keep its line breaks for output.
+    """
     return (
-        collapse_ws(author).casefold(),
-        collapse_ws(poem_name).casefold(),
+        author.casefold(),
+        poem_name.casefold(),
         collapse_ws(text).casefold(),
     )
 
 
-def row_hash(row: Row) -> str:
-    """Generate SHA1 hash for a row based on normalized content."""
-    a, p, t = normalize_key(row.author, row.poem_name, row.text)
+def row_hash(author: str, poem_name: str, text: str) -> bytes:
+    """
+    Generate a 16-byte digest for a row based on normalized content.
+
+    Uses BLAKE3 when the optional blake3 package is installed, otherwise SHA-256
+    (hardware accelerated by OpenSSL on CPUs with SHA extensions).
+    """
+    a, p, t = normalize_key(author, poem_name, text)
     payload = "\n".join((a, p, t)).encode("utf-8")
-    return hashlib.sha1(payload).hexdigest()
+    if blake3 is not None:
+        return blake3(payload).digest()[:16]
+    return hashlib.sha256(payload).digest()[:16]
 
 
-def is_empty(value: Optional[str]) -> bool:
-    """Check if a value is empty or only whitespace."""
-    if value is None:
-        return True
-    return collapse_ws(value) == ""
+def iter_csv_columns(
+    csv_path: Path,
+    columns: Tuple[str, str, str],
+    on_invalid_row: Optional[Callable[[], None]] = None,
+) -> Iterator[Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]]:
+    """
+    Stream the given columns of a CSV file with the PyArrow reader.
 
+    Yields one tuple of column value lists per record batch (see iter_csv_batches).
+    """
+    for batch in iter_csv_batches(csv_path, columns, on_invalid_row):
+        yield tuple(batch.column(name).to_pylist() for name in columns)
 
-def iter_rows_poems_csv(csv_path: Path) -> Iterator[Row]:
+
+def iter_csv_rows(csv_path: Path, columns: Tuple[str, str, str]) -> Iterator[Optional[RowTuple]]:
+    """
+    Yield rows from the given author, poem name and text columns of a CSV file.
+
+    author and poem_name are whitespace-collapsed and text is only stripped, as
+    normalize_key expects. Each row skipped for having the wrong number of fields
+    yields None, after the record batch it was found in.
+    """
+    malformed = 0
+
+    def count_malformed() -> None:
+        nonlocal malformed
+        malformed += 1
+
+    for authors, poem_names, texts in iter_csv_columns(csv_path, columns, count_malformed):
+        for author, poem_name, text in zip(authors, poem_names, texts):
+            yield collapse_ws(author or ""), collapse_ws(poem_name or ""), (text or "").strip()
+        yield from repeat(None, malformed)
+        malformed = 0
+    yield from repeat(None, malformed)
+
+
+def iter_rows_poems_csv(csv_path: Path) -> Iterator[Optional[RowTuple]]:
     """
     Iterator for poems.csv format.
 
     Expected columns: writer, poem, text
     """
-    with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        for raw in reader:
-            author = raw.get("writer") or ""
-            poem_name = raw.get("poem") or ""
-            text = raw.get("text") or ""
-            yield Row(
-                author=collapse_ws(author),
-                poem_name=collapse_ws(poem_name),
-                text=text.strip(),
-            )
+    yield from iter_csv_rows(csv_path, ("writer", "poem", "text"))
 
 
-def iter_rows_russian_poetry_with_theme(csv_path: Path) -> Iterator[Row]:
+def iter_rows_russian_poetry_with_theme(csv_path: Path) -> Iterator[Optional[RowTuple]]:
     """
     Iterator for russianPoetryWithTheme.csv format.
 
     Expected columns: author, name, text
     """
-    with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        for raw in reader:
-            author = raw.get("author") or ""
-            poem_name = raw.get("name") or ""
-            text = raw.get("text") or ""
-            yield Row(
-                author=collapse_ws(author),
-                poem_name=collapse_ws(poem_name),
-                text=text.strip(),
-            )
+    yield from iter_csv_rows(csv_path, ("author", "name", "text"))
+
+
+def prepare_rows(it: Iterable[Optional[RowTuple]]) -> Iterator[HashedRow]:
+    """
+    Pair each row with its dedup hash, or with None if a required field is empty.
+
+    Rows must come from the iter_rows_* readers, which already collapse or strip
+    whitespace, so a blank field is simply an empty string here. The None yielded
+    for a malformed row becomes (None, None).
+    """
+    for row in it:
+        if row is None:
+            yield None, None
+            continue
+        author, poem_name, text = row
+        if author and poem_name and text:
+            yield row_hash(author, poem_name, text), row
+        else:
+            yield None, row
+
+
+def send_prepared_rows(
+    iter_rows: Callable[[Path], Iterator[Optional[RowTuple]]],
+    csv_path: Path,
+    queue: "multiprocessing.queues.Queue[HashedRowBatch]",
+    batch_size: int = WORKER_BATCH_SIZE,
+) -> None:
+    """
+    Read, normalize and hash a source file. Runs in a worker process.
+
+    Prepared rows are put on the queue in lists of batch_size followed by None, so
+    the consumer can start deduplicating before the file is fully read. On failure
+    the exception is put on the queue instead of the end marker.
+    """
+    try:
+        batch: List[HashedRow] = []
+        for item in prepare_rows(iter_rows(csv_path)):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                queue.put(batch)
+                batch = []
+        if batch:
+            queue.put(batch)
+    except Exception as exc:
+        queue.put(exc)
+    else:
+        queue.put(None)
+
+
+def iter_queued_rows(
+    queue: "multiprocessing.queues.Queue[HashedRowBatch]", process: multiprocessing.process.BaseProcess
+) -> Iterator[HashedRow]:
+    """Yield the rows sent by send_prepared_rows, re-raising a worker exception."""
+    while True:
+        try:
+            item = queue.get(timeout=1.0)
+        except Empty:
+            # The worker flushes its queue before exiting, so one last look is enough.
+            if process.is_alive():
+                continue
+            try:
+                item = queue.get_nowait()
+            except Empty:
+                raise RuntimeError(f"merge worker exited with code {process.exitcode}") from None
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield from item
+
+
+class ParquetRowWriter:
+    """Buffer merged rows and write them to a Parquet file in column batches."""
+
+    def __init__(self, path: Path, batch_size: int = PARQUET_BATCH_SIZE) -> None:
+        self._schema = pa.schema([(name, pa.string()) for name in DATASET_COLUMNS])
+        self._writer = pq.ParquetWriter(str(path), self._schema, compression="zstd")
+        self._batch_size = batch_size
+        self._columns: List[List[str]] = [[] for _ in DATASET_COLUMNS]
+
+    def __enter__(self) -> "ParquetRowWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def writerow(self, record: Sequence[str]) -> None:
+        """Append a row given in DATASET_COLUMNS order; same interface as csv.writer."""
+        for values, value in zip(self._columns, record):
+            values.append(value)
+        if len(self._columns[0]) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows as one Parquet row group."""
+        if not self._columns[0]:
+            return
+        self._writer.write_table(pa.Table.from_arrays(self._columns, schema=self._schema))
+        self._columns = [[] for _ in DATASET_COLUMNS]
+
+    def close(self) -> None:
+        """Flush remaining rows and finalize the file."""
+        self.flush()
+        self._writer.close()
 
 
 def ensure_db(conn: sqlite3.Connection) -> None:
     """Initialize SQLite database for deduplication."""
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA mmap_size=268435456;")
+    conn.execute("PRAGMA cache_size=-262144;")
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS seen (
-            h TEXT PRIMARY KEY
+            h BLOB PRIMARY KEY
         )
         """.strip()
     )
@@ -102,65 +254,88 @@ def ensure_db(conn: sqlite3.Connection) -> None:
 def merge_datasets(
     poems_csv: Path,
     themed_csv: Path,
-    output_csv: Path,
+    output_path: Path,
     sqlite_path: Optional[Path] = None,
     report_every: int = 200_000,
+    workers: int = 1,
 ) -> Dict[str, int]:
     """
-    Merge two poem CSV files into a single deduplicated CSV.
+    Merge two poem CSV files into a single deduplicated dataset.
 
     Args:
         poems_csv: Path to poems.csv
         themed_csv: Path to russianPoetryWithTheme.csv
-        output_csv: Output path for merged CSV
-        sqlite_path: Path for SQLite dedup database (optional)
+        output_path: Output path for the merged dataset. A .parquet path is
+            written as zstd-compressed Parquet, any other path as CSV.
+        sqlite_path: Path for SQLite dedup database (optional). By default seen
+            hashes are kept in memory; pass a path for corpora that do not fit in RAM.
         report_every: Print progress every N rows (0 disables)
+        workers: Above 1, each source file is read in its own worker process,
+            concurrently with dedup; 1 reads them sequentially in-process
 
     Returns:
-        Dictionary with statistics (read_total, written, skipped_empty, skipped_duplicate)
+        Dictionary with statistics (read_total, written, skipped_empty,
+        skipped_duplicate, skipped_malformed). skipped_malformed counts CSV rows
+        with too few or too many fields, which are dropped unread.
     """
-    configure_csv_field_size_limit()
-    if sqlite_path is None:
-        sqlite_path = output_csv.with_suffix(".dedup.sqlite3")
-
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
 
     counters = {
         "read_total": 0,
         "written": 0,
         "skipped_empty": 0,
         "skipped_duplicate": 0,
+        "skipped_malformed": 0,
     }
 
-    conn = sqlite3.connect(str(sqlite_path))
+    seen: Set[bytes] = set()
+    conn: Optional[sqlite3.Connection] = None
+    if sqlite_path is not None:
+        # Transactions are managed explicitly in handle_source.
+        conn = sqlite3.connect(str(sqlite_path), isolation_level=None)
     try:
-        ensure_db(conn)
-        with output_csv.open("w", encoding="utf-8", newline="") as out_f:
-            writer = csv.DictWriter(out_f, fieldnames=["author", "poem_name", "text"])
-            writer.writeheader()
+        if conn is not None:
+            ensure_db(conn)
+        with contextlib.ExitStack() as stack:
+            if output_path.suffix == ".parquet":
+                writer = stack.enter_context(ParquetRowWriter(output_path))
+            else:
+                out_f = stack.enter_context(
+                    output_path.open("w", encoding="utf-8", newline="", buffering=IO_BUFFER_SIZE)
+                )
+                writer = csv.writer(out_f)
+                writer.writerow(DATASET_COLUMNS)
 
-            def handle_source(source_name: str, it: Iterable[Row]) -> None:
+            def handle_source(source_name: str, it: Iterable[HashedRow]) -> None:
                 nonlocal counters
                 batch = 0
-                for row in it:
+                seen_add = seen.add
+                writerow = writer.writerow
+                if conn is not None:
+                    conn.execute("BEGIN IMMEDIATE")
+                for h, row in it:
                     counters["read_total"] += 1
-                    if is_empty(row.author) or is_empty(row.poem_name) or is_empty(row.text):
-                        counters["skipped_empty"] += 1
+                    if h is None:
+                        if row is None:
+                            counters["skipped_malformed"] += 1
+                        else:
+                            counters["skipped_empty"] += 1
                         continue
-                    h = row_hash(row)
-                    cur = conn.execute("INSERT OR IGNORE INTO seen(h) VALUES (?)", (h,))
-                    if cur.rowcount == 0:
+                    if conn is None:
+                        duplicate = h in seen
+                        if not duplicate:
+                            seen_add(h)
+                    else:
+                        duplicate = conn.execute(SEEN_INSERT_SQL, (h,)).rowcount == 0
+                    if duplicate:
                         counters["skipped_duplicate"] += 1
                     else:
-                        writer.writerow({
-                            "author": row.author,
-                            "poem_name": row.poem_name,
-                            "text": row.text,
-                        })
+                        writerow(row)
                         counters["written"] += 1
                     batch += 1
-                    if batch >= 10_000:
-                        conn.commit()
+                    if conn is not None and batch >= SQLITE_BATCH_SIZE:
+                        conn.execute("COMMIT")
+                        conn.execute("BEGIN IMMEDIATE")
                         batch = 0
                     if report_every > 0 and counters["read_total"] % report_every == 0:
                         print(
@@ -168,12 +343,41 @@ def merge_datasets(
                             f"dup={counters['skipped_duplicate']} empty={counters['skipped_empty']}",
                             file=sys.stderr,
                         )
-                if batch:
-                    conn.commit()
+                if conn is not None:
+                    conn.execute("COMMIT")
 
-            handle_source("poems.csv", iter_rows_poems_csv(poems_csv))
-            handle_source("russianPoetryWithTheme.csv", iter_rows_russian_poetry_with_theme(themed_csv))
+            sources = [
+                ("poems.csv", iter_rows_poems_csv, poems_csv),
+                ("russianPoetryWithTheme.csv", iter_rows_russian_poetry_with_theme, themed_csv),
+            ]
+            if workers > 1:
+                # Each source is parsed and hashed in its own process and streamed
+                # back in batches; dedup and writing stay in this process and consume
+                # the sources in order, so output is unchanged.
+                ctx = multiprocessing.get_context()
+                started = []
+                try:
+                    for source_name, iter_rows, csv_path in sources:
+                        queue = ctx.Queue()
+                        process = ctx.Process(
+                            target=send_prepared_rows, args=(iter_rows, csv_path, queue), daemon=True
+                        )
+                        process.start()
+                        started.append((source_name, queue, process))
+                    for source_name, queue, process in started:
+                        handle_source(source_name, iter_queued_rows(queue, process))
+                except BaseException:
+                    for _, _, process in started:
+                        process.terminate()
+                    raise
+                finally:
+                    for _, _, process in started:
+                        process.join()
+            else:
+                for source_name, iter_rows, csv_path in sources:
+                    handle_source(source_name, prepare_rows(iter_rows(csv_path)))
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
     return counters
@@ -1,9 +1,37 @@
 import re
+from functools import lru_cache
 
 import pandas as pd
 
 from src.consts import AUTHOR_MAPPING
 
+# Same characters as str.isspace() / Python's \s, spelled out so that pandas
+# string methods match identically whether they run on Python re or on RE2.
+WHITESPACE_PATTERN = "[\t-\r\x1c-\x20\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]+"
+_WS_RE = re.compile(WHITESPACE_PATTERN)
+
+TRAILING_DOTS_PATTERN = r"\.{2,}$"
+_TRAILING_DOTS_RE = re.compile(TRAILING_DOTS_PATTERN)
+
+# Uppercase poem name tokens that are kept as is instead of being re-cased.
+_ROMAN_NUMERALS = frozenset({
+    "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X",
+    "XI", "XII", "XIII", "XIV", "XV", "XVI", "XVII", "XVIII", "XIX", "XX",
+})
+_ABBREVIATIONS = frozenset({"NN", "ТВС", "ТБЦ", "МЮД"})
+
+# Quote, dash and ё/Ё substitutions applied by text comparison normalization,
+# followed by removal of PUNCTUATION_PATTERN. The ellipsis is removed along with
+# the other punctuation, the same result as expanding it to "..." first.
+TEXT_COMPARISON_REPLACEMENTS = (
+    ("«", '"'), ("»", '"'), ("\u201c", '"'), ("\u201d", '"'),
+    ("\u2018", "'"), ("\u2019", "'"),
+    ("—", "-"), ("–", "-"), ("―", "-"),
+    ("ё", "е"), ("Ё", "Е"),
+)
+PUNCTUATION_PATTERN = r"[.,;:!?…]"
+_PUNCTUATION_RE = re.compile(PUNCTUATION_PATTERN)
+
 
 def normalize_author(author: str) -> str:
     """
@@ -22,6 +50,7 @@ def normalize_author(author: str) -> str:
     return AUTHOR_MAPPING.get(author, author)
 
 
+@lru_cache(maxsize=65536)
 def normalize_poem_name(name: str) -> str:
     """
     Normalize poem name for display.
@@ -34,22 +63,16 @@ def normalize_poem_name(name: str) -> str:
     if pd.isna(name):
         return ""
     s = str(name).strip()
-    s = re.sub(r"\.{2,}$", "", s)
-    s = re.sub(r"\s+", " ", s)
-
-    roman_numerals = {
-        "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X",
-        "XI", "XII", "XIII", "XIV", "XV", "XVI", "XVII", "XVIII", "XIX", "XX",
-    }
-    abbreviations = {"NN", "ТВС", "ТБЦ", "МЮД"}
+    s = _TRAILING_DOTS_RE.sub("", s)
+    s = _WS_RE.sub(" ", s)
 
     if s.isupper():
-        if s in roman_numerals or s in abbreviations:
+        if s in _ROMAN_NUMERALS or s in _ABBREVIATIONS:
             return s
         words = s.split()
         normalized_words = []
         for i, word in enumerate(words):
-            if word in roman_numerals or word in abbreviations:
+            if word in _ROMAN_NUMERALS or word in _ABBREVIATIONS:
                 normalized_words.append(word)
             elif i == 0:
                 normalized_words.append(word.capitalize())
@@ -68,8 +91,8 @@ def normalize_poem_name_for_dedup(name: str) -> str:
     if pd.isna(name):
         return ""
     s = str(name).strip().lower()
-    s = re.sub(r"\.{2,}$", "", s)
-    s = re.sub(r"\s+", " ", s)
+    s = _TRAILING_DOTS_RE.sub("", s)
+    s = _WS_RE.sub(" ", s)
     return s
 
 
@@ -87,13 +110,41 @@ def normalize_text_for_comparison(text: str) -> str:
     """
     if pd.isna(text):
         return ""
-    s = str(text)
-    s = re.sub(r"\s+", " ", s)
-    s = s.replace("«", '"').replace("»", '"').replace(""", '"').replace(""", '"')
-    s = s.replace("'", "'").replace("'", "'")
+    s = _WS_RE.sub(" ", str(text))
+    s = s.replace("«", '"').replace("»", '"').replace("\u201c", '"').replace("\u201d", '"')
+    s = s.replace("\u2018", "'").replace("\u2019", "'")
     s = s.replace("—", "-").replace("–", "-").replace("―", "-")
-    s = s.replace("…", "...")
     s = s.replace("ё", "е").replace("Ё", "Е")
-    s = re.sub(r"[.,;:!?]", "", s)
-    s = s.strip().lower()
-    return s
+    s = _PUNCTUATION_RE.sub("", s)
+    return s.strip().lower()
+
+
+def _as_strings(values: pd.Series) -> pd.Series:
+    """Fill missing values with "" and make sure the Series holds strings."""
+    if pd.api.types.is_string_dtype(values):
+        return values.fillna("")
+    return values.fillna("").astype(str)
+
+
+def normalize_authors(authors: pd.Series) -> pd.Series:
+    """Vectorized normalize_author over a Series of author names."""
+    s = _as_strings(authors).str.strip()
+    return s.map(AUTHOR_MAPPING).where(lambda mapped: mapped.notna(), s).astype(s.dtype)
+
+
+def normalize_poem_names_for_dedup(names: pd.Series) -> pd.Series:
+    """Vectorized normalize_poem_name_for_dedup over a Series of poem names."""
+    s = _as_strings(names).str.strip().str.lower()
+    s = s.str.replace(TRAILING_DOTS_PATTERN, "", regex=True)
+    return s.str.replace(WHITESPACE_PATTERN, " ", regex=True)
+
+
+def normalize_texts_for_comparison(texts: pd.Series) -> pd.Series:
+    """Vectorized normalize_text_for_comparison over a Series of poem texts."""
+    s = _as_strings(texts).str.replace(WHITESPACE_PATTERN, " ", regex=True)
+    # Literal and regex .str.replace run natively on Arrow strings, unlike
+    # .str.translate, which pandas applies element by element.
+    for old, new in TEXT_COMPARISON_REPLACEMENTS:
+        s = s.str.replace(old, new, regex=False)
+    s = s.str.replace(PUNCTUATION_PATTERN, "", regex=True)
+    return s.str.strip().str.lower()
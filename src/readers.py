@@ -0,0 +1,74 @@
+import sys
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from src.consts import CSV_MAX_BLOCK_SIZE, IO_BUFFER_SIZE
+
+
+def iter_csv_batches(
+    csv_path: Path,
+    columns: Sequence[str],
+    on_invalid_row: Optional[Callable[[], None]] = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Stream record batches of the given columns of a CSV file, all read as strings.
+
+    With newlines allowed in values Arrow needs every record to fit in one read
+    block, so when a record straddles a block boundary the file is reopened with a
+    larger block size and the rows already yielded are skipped. Missing columns
+    yield None values.
+
+    Rows with too few or too many fields are skipped, including their values.
+    on_invalid_row is called once per skipped row; without it the skipped rows are
+    counted on stderr.
+    """
+    block_size = IO_BUFFER_SIZE
+    rows_done = 0
+    invalid_reported = 0
+    while True:
+        invalid_rows = 0
+
+        def skip_invalid_row(row: pacsv.InvalidRow) -> str:
+            nonlocal invalid_rows, invalid_reported
+            invalid_rows += 1
+            # A retry re-reads the rows seen by earlier attempts; report only new ones.
+            if invalid_rows > invalid_reported:
+                invalid_reported += 1
+                if on_invalid_row is not None:
+                    on_invalid_row()
+            return "skip"
+
+        to_skip = rows_done
+        try:
+            reader = pacsv.open_csv(
+                csv_path,
+                read_options=pacsv.ReadOptions(block_size=block_size),
+                parse_options=pacsv.ParseOptions(
+                    newlines_in_values=True,
+                    invalid_row_handler=skip_invalid_row,
+                ),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=list(columns),
+                    include_missing_columns=True,
+                    column_types={name: pa.string() for name in columns},
+                ),
+            )
+            for batch in reader:
+                if to_skip >= batch.num_rows:
+                    to_skip -= batch.num_rows
+                    continue
+                batch = batch.slice(to_skip)
+                to_skip = 0
+                yield batch
+                rows_done += batch.num_rows
+        except pa.ArrowInvalid as exc:
+            if "straddl" not in str(exc) or block_size >= CSV_MAX_BLOCK_SIZE:
+                raise
+            block_size = min(block_size * 8, CSV_MAX_BLOCK_SIZE)
+            continue
+        if invalid_rows and on_invalid_row is None:
+            print(f"[{csv_path.name}] skipped {invalid_rows} malformed rows", file=sys.stderr)
+        return
@@ -1,13 +1,18 @@
+from pathlib import Path
 from typing import Dict, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-from src.consts import AUTHOR_MAPPING
+from src.consts import AUTHOR_MAPPING, DATASET_COLUMNS, IO_BUFFER_SIZE
+from src.readers import iter_csv_batches
 from src.normalizers import (
-    normalize_author,
+    normalize_authors,
     normalize_poem_name,
-    normalize_poem_name_for_dedup,
-    normalize_text_for_comparison,
+    normalize_poem_names_for_dedup,
+    normalize_texts_for_comparison,
 )
 
 
@@ -47,11 +52,8 @@ def validate_author_format(df: pd.DataFrame) -> int:
 
     Returns count of authors that might need normalization.
     """
-    unmapped = 0
-    for author in df["author"].unique():
-        if author not in AUTHOR_MAPPING.values() and author not in AUTHOR_MAPPING:
-            unmapped += 1
-    return unmapped
+    known = set(AUTHOR_MAPPING) | set(AUTHOR_MAPPING.values())
+    return len(set(df["author"].dropna().unique()) - known)
 
 
 def validate_poem_name_format(df: pd.DataFrame) -> Tuple[int, int]:
@@ -65,10 +67,36 @@ def validate_poem_name_format(df: pd.DataFrame) -> Tuple[int, int]:
     return trailing, uppercase
 
 
-def validate_and_fix_dataset(input_path: str, output_path: str) -> Dict[str, int]:
+def first_occurrence_mask(codes: np.ndarray) -> np.ndarray:
+    """Boolean mask keeping the first row of each distinct integer code."""
+    keep = np.zeros(len(codes), dtype=bool)
+    keep[np.unique(codes, return_index=True)[1]] = True
+    return keep
+
+
+def read_dataset(path: str) -> pd.DataFrame:
+    """
+    Read a poems dataset from CSV, or from Parquet if the path ends in .parquet.
+
+    Columns are returned as pyarrow-backed strings. CSV fields are never turned into
+    missing values: empty fields load as "" and strings such as "NA" or "null" are
+    kept, so a CSV and a Parquet file with the same rows load identically.
+    """
+    if path.endswith(".parquet"):
+        table = pq.read_table(path)
+    else:
+        # pd.read_csv(engine="pyarrow") cannot parse the newlines inside poem texts.
+        schema = pa.schema([(name, pa.string()) for name in DATASET_COLUMNS])
+        table = pa.Table.from_batches(iter_csv_batches(Path(path), DATASET_COLUMNS), schema=schema)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def validate_and_fix_dataset(input_path: str, output_path: str) -> Tuple[pd.DataFrame, Dict[str, int]]:
     """
     Validate and fix the merged poems dataset.
 
+    The input may be CSV or Parquet (see read_dataset); output is always CSV.
+
     Steps:
     1. Normalize author names to canonical format
     2. Normalize poem names (remove trailing dots, fix UPPERCASE)
@@ -77,40 +105,49 @@ def validate_and_fix_dataset(input_path: str, output_path: str) -> Dict[str, int
     5. Sort by author and poem name
     6. Save cleaned dataset
 
-    Returns statistics dictionary.
+    Returns tuple of (cleaned dataframe, statistics dictionary). The dataframe holds
+    the same values read_dataset(output_path) would load.
     """
-    df = pd.read_csv(input_path)
+    df = read_dataset(input_path)
 
     stats = {
         "original_rows": len(df),
         "original_unique_authors": df["author"].nunique(),
     }
 
-    df["author"] = df["author"].apply(normalize_author)
+    df["author"] = normalize_authors(df["author"])
     stats["normalized_unique_authors"] = df["author"].nunique()
 
-    df["poem_name"] = df["poem_name"].apply(normalize_poem_name)
-
-    df["text_normalized"] = df["text"].apply(normalize_text_for_comparison)
-    df["poem_name_normalized"] = df["poem_name"].apply(normalize_poem_name_for_dedup)
+    # Poem names repeat a lot, so the cached scalar normalizer mostly hits.
+    # Missing values are filled first to keep the cache keyed by strings.
+    poem_names = df["poem_name"].fillna("")
+    df["poem_name"] = poem_names.apply(normalize_poem_name).astype(poem_names.dtype)
 
-    duplicates_before = df[df.duplicated(subset=["text_normalized"], keep=False)]
-    stats["duplicates_by_text_before"] = len(duplicates_before)
+    # Dedup works on integer codes from pd.factorize instead of hashing the
+    # normalized strings again in every duplicated/drop_duplicates call.
+    text_codes, _ = pd.factorize(normalize_texts_for_comparison(df["text"]), sort=False)
+    text_counts = np.bincount(text_codes)
+    stats["duplicates_by_text_before"] = int(text_counts[text_counts > 1].sum())
+    df = df[first_occurrence_mask(text_codes)]
 
-    df = df.drop_duplicates(subset=["text_normalized"], keep="first")
-    df = df.drop_duplicates(subset=["author", "poem_name_normalized"], keep="first")
-    df = df.drop(columns=["text_normalized", "poem_name_normalized"])
+    author_codes, _ = pd.factorize(df["author"], sort=False)
+    name_codes, names = pd.factorize(normalize_poem_names_for_dedup(df["poem_name"]), sort=False)
+    pair_codes = author_codes.astype(np.int64) * len(names) + name_codes
+    df = df[first_occurrence_mask(pair_codes)]
 
     stats["rows_after_dedup"] = len(df)
     stats["removed_duplicates"] = stats["original_rows"] - stats["rows_after_dedup"]
 
-    duplicates_after = df[df.duplicated(subset=["text"], keep=False)]
-    stats["duplicates_by_text_after"] = len(duplicates_after)
+    stats["duplicates_by_text_after"] = int(df.duplicated(subset=["text"], keep=False).sum())
 
+    # author and poem_name are already filled by normalization; a missing text (only
+    # possible with Parquet input) is written as "" and must read back the same way.
+    df["text"] = df["text"].fillna("")
     df = df.sort_values(by=["author", "poem_name"]).reset_index(drop=True)
-    df.to_csv(output_path, index=False)
+    with open(output_path, "w", encoding="utf-8", newline="", buffering=IO_BUFFER_SIZE) as out_f:
+        df.to_csv(out_f, index=False)
 
-    return stats
+    return df, stats
 
 
 def print_validation_report(df: pd.DataFrame) -> None: